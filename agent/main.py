@@ -12,6 +12,9 @@ import os
 import logging
 import asyncio
 import sys
+import time
+from pathlib import Path
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Dict, Any
 import click
 import msal
@@ -36,9 +39,13 @@ logger = logging.getLogger(__name__)
 # Set up Rich console
 console = Console()
 
+# Paths next to this script, resolved once at import
+_HERE = Path(__file__).resolve().parent
+ENV_PATH = _HERE / ".env"
+CACHE_FILE = _HERE / ".token_cache.json"
+
 # Load environment variables from .env file in the same folder
-env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
-load_dotenv(dotenv_path=env_path)
+load_dotenv(dotenv_path=ENV_PATH)
 
 # Azure Entra ID configuration from environment variables
 TENANT_ID = os.getenv("TENANT_ID")  # Tenant ID
@@ -63,22 +70,18 @@ if not all([TENANT_ID, CLIENT_ID, API_SCOPE]):
     if not API_SCOPE:
         logger.error("API_SCOPE is missing")
 
-# Token cache file
-cache_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".token_cache.json")
-
 
 def load_cache():
     """Load the token cache from file"""
     try:
         cache = msal.SerializableTokenCache()
-        if os.path.exists(cache_file):
-            with open(cache_file, "r") as f:
-                cache_data = f.read()
-                if cache_data:
-                    cache.deserialize(cache_data)
-                    logger.info(f"Token cache loaded from {cache_file}")
+        if CACHE_FILE.exists():
+            cache_data = CACHE_FILE.read_text()
+            if cache_data:
+                cache.deserialize(cache_data)
+                logger.info(f"Token cache loaded from {CACHE_FILE}")
         else:
-            logger.info(f"Token cache file not found at {cache_file}, creating new cache")
+            logger.info(f"Token cache file not found at {CACHE_FILE}, creating new cache")
         return cache
     except Exception as e:
         logger.error(f"Error loading token cache: {e}")
@@ -90,33 +93,49 @@ def save_cache(cache):
     if cache.has_state_changed:
         try:
             # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
             
             # Write the cache to file
-            with open(cache_file, "w") as f:
-                f.write(cache.serialize())
+            CACHE_FILE.write_text(cache.serialize())
             
-            logger.info(f"Token cache saved to {cache_file}")
+            logger.info(f"Token cache saved to {CACHE_FILE}")
             
             # Verify file permissions (on Unix/Linux/macOS)
             if os.name != "nt":  # Not Windows
-                os.chmod(cache_file, 0o600)  # Read/write for owner only
+                CACHE_FILE.chmod(0o600)  # Read/write for owner only
                 
         except Exception as e:
             logger.error(f"Error saving token cache: {e}")
 
 
+# Token cache and MSAL app are created on first use and then reused; MSAL apps are
+# thread-safe but their constructor runs authority discovery over the network
+_cache = None
+_msal_app = None
+
+
+def _get_msal_app():
+    """Return the shared MSAL app, creating it and loading the token cache on first use"""
+    global _cache, _msal_app
+    if _msal_app is None:
+        if not (TENANT_ID and CLIENT_ID):
+            logger.error("Cannot create MSAL app: TENANT_ID and CLIENT_ID are required")
+            return None
+        _cache = load_cache()
+        _msal_app = msal.PublicClientApplication(
+            client_id=CLIENT_ID,
+            authority=AUTHORITY,
+            token_cache=_cache
+        )
+    return _msal_app
+
+
 def get_token():
     """Get an access token for the API"""
-    # Initialize token cache
-    cache = load_cache()
-    
-    # Create MSAL app
-    app = msal.PublicClientApplication(
-        client_id=CLIENT_ID,
-        authority=AUTHORITY,
-        token_cache=cache
-    )
+    app = _get_msal_app()
+    if app is None:
+        return None
+    cache = _cache
     
     # Check if there's a token in cache
     accounts = app.get_accounts()
@@ -150,6 +169,10 @@ def get_token():
     return result
 
 
+# In-process copy of the last access token so repeated calls skip disk I/O and MSAL
+_token_cache = {"token": None, "expires_at": 0}
+
+
 def get_jwt_token():
     """
     Get just the JWT token string for programmatic use.
@@ -157,13 +180,25 @@ def get_jwt_token():
     Returns:
         str: The access token string, or None if acquisition fails
     """
+    # Reuse the cached token unless it expires within the next minute
+    if _token_cache["token"] and time.time() < _token_cache["expires_at"] - 60:
+        return _token_cache["token"]
+
     with console.status("[bold green]Acquiring authentication token...") as status:
         result = get_token()
     
+    if result is None:
+        console.print(Panel("[bold red]✗ Failed to obtain token", 
+                           title="Authentication Error", 
+                           border_style="red"))
+        return None
+    
     if "access_token" in result:
         console.print(Panel("[bold green]✓ Token acquired successfully!", 
                            title="Authentication", 
                            border_style="green"))
+        _token_cache["token"] = result["access_token"]
+        _token_cache["expires_at"] = time.time() + int(result.get("expires_in", 0))
         return result["access_token"]
     else:
         console.print(Panel(f"[bold red]✗ Failed to obtain token: {result.get('error')}\n"
@@ -174,67 +209,110 @@ def get_jwt_token():
         logger.error(f"Error description: {result.get('error_description')}")
         return None
     
-# Global progress object for tracking tool progress
-from rich.live import Live
+class _ProgressState:
+    """Progress display for tools (FastMCP specific); instances are used as the progress handler"""
+
+    __slots__ = ("live", "progress", "task_id", "last_update", "throttle", "pending_update", "pending_timer")
+
+    def __init__(self, throttle: float = 0.5):
+        self.live = None
+        self.progress = None
+        self.task_id = None
+        # Minimum time between display updates (in seconds)
+        self.throttle = throttle
+        self.last_update = 0
+        # Latest (progress, total, message) received within the current throttle window
+        self.pending_update = None
+        self.pending_timer = None
+
+    async def __call__(
+        self,
+        progress: float, 
+        total: float | None, 
+        message: str | None
+    ) -> None:
+        """Handle progress updates for tools (FastMCP specific)"""
+        loop = asyncio.get_event_loop()
+        elapsed = loop.time() - self.last_update
+        finished = total is not None and progress >= total
+
+        # Write immediately when outside the throttle window or when the tool is done
+        if finished or elapsed >= self.throttle:
+            self._cancel_pending()
+            self._apply(progress, total, message)
+            return
 
-_progress_live = None
-_progress = None
-_task_id = None
-
-# Set a throttle to prevent too frequent updates (in seconds)
-_progress_throttle = 0.1
-_last_update_time = 0
-
-async def my_progress_handler(
-    progress: float, 
-    total: float | None, 
-    message: str | None
-) -> None:
-    """Handle progress updates for tools (FastMCP specific)"""
-    global _progress_live, _progress, _task_id, _last_update_time
-    
-    # Initialize progress if not already done
-    if _progress is None:
-        _progress = Progress(
-            SpinnerColumn(),
-            TextColumn("[bold blue]{task.description}"),
-            TextColumn("[bold green]{task.percentage:.1f}%"),
-            TextColumn("[yellow]{task.fields[message]}"),
-            refresh_per_second=10,  # Limit refresh rate
-        )
-        _task_id = _progress.add_task("Tool Progress", total=100, message="")
-        _progress_live = Live(_progress, console=console, refresh_per_second=5, auto_refresh=False)
-        _progress_live.start()
-    
-    # Get current time for throttling
-    current_time = asyncio.get_event_loop().time()
-    
-    # Throttle updates
-    if current_time - _last_update_time < _progress_throttle:
-        return
-    
-    _last_update_time = current_time
-    
-    if total is not None:
-        percentage = (progress / total) * 100
-        _progress.update(_task_id, completed=percentage, message=message or "")
+        # Otherwise keep only the latest update and write it once the window ends
+        self.pending_update = (progress, total, message)
+        if self.pending_timer is None:
+            self.pending_timer = loop.call_later(self.throttle - elapsed, self._flush)
+
+    def _apply(self, progress: float, total: float | None, message: str | None) -> None:
+        """Write a progress update to the display; Rich auto-refreshes the live view"""
+        # Initialize progress if not already done
+        if self.progress is None:
+            self.progress = Progress(
+                SpinnerColumn(),
+                TextColumn("[bold blue]{task.description}"),
+                TextColumn("[bold green]{task.percentage:.1f}%"),
+                TextColumn("[yellow]{task.fields[message]}"),
+            )
+            self.task_id = self.progress.add_task("Tool Progress", total=100, message="")
+            self.live = Live(self.progress, console=console, refresh_per_second=2, auto_refresh=True)
+            self.live.start()
+
+        self.last_update = asyncio.get_event_loop().time()
+
+        if total is not None:
+            percentage = (progress / total) * 100
+            self.progress.update(self.task_id, completed=percentage, message=message or "")
+        else:
+            # Handle indeterminate progress
+            self.progress.update(self.task_id, message=message or "")
+
+        # If we've reached 100%, clean up the progress display
+        if total is not None and progress >= total:
+            self.close()
+
+    def _flush(self) -> None:
+        """Write the latest coalesced progress update when the throttle window ends"""
+        self.pending_timer = None
+        if self.pending_update is not None:
+            update, self.pending_update = self.pending_update, None
+            self._apply(*update)
+
+    def _cancel_pending(self) -> None:
+        if self.pending_timer is not None:
+            self.pending_timer.cancel()
+            self.pending_timer = None
+        self.pending_update = None
+
+    def close(self) -> None:
+        """Stop the live display and drop any pending update"""
+        self._cancel_pending()
+        if self.live is not None:
+            self.live.stop()
+        self.live = None
+        self.progress = None
+        self.task_id = None
+
+
+# Shared progress handler for tracking tool progress
+my_progress_handler = _ProgressState()
+
+@asynccontextmanager
+async def ensure_connected(client: MCPClient):
+    """Reuse the client's open session, or open one for the duration of the block"""
+    if client.is_connected():
+        yield client
     else:
-        # Handle indeterminate progress
-        _progress.update(_task_id, message=message or "")
-    
-    # Refresh the live display
-    _progress_live.refresh()
-        
-    # If we've reached 100%, clean up the progress display
-    if total is not None and progress >= total:
-        _progress_live.stop()
-        _progress_live = None
-        _progress = None
+        async with client:
+            yield client
 
 async def list_tools(client: MCPClient):
     """List available tools on the MCP server"""
     try:
-        async with client:
+        async with ensure_connected(client):
             logger.info("Connected to the MCP server successfully")
        
             with console.status("[bold green]Listing available tools...") as status:
@@ -249,10 +327,10 @@ async def list_tools(client: MCPClient):
                 
                 for tool in tools:
                     table.add_row(tool.name, tool.description)
-                    # Still log for debugging purposes
-                    logger.info(f"Tool: {tool.name}")
-                    logger.info(f"  Description: {tool.description}")
-                    logger.info("---")
+                
+                # Still log for debugging purposes, as a single record
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("\n".join(f"{tool.name}: {tool.description}" for tool in tools))
                 
                 console.print(table)
             else:
@@ -267,21 +345,25 @@ async def list_tools(client: MCPClient):
 async def run_tool(client: MCPClient, tool_name: str, params: Dict[str, Any], progress_handler=None):
     """Run a specific tool on the MCP server"""
     try:
-        async with client:
+        async with ensure_connected(client):
             with console.status(f"[bold blue]Executing tool [cyan]{tool_name}[/cyan]...") as status:
-                logger.info(f"Calling tool '{tool_name}' with parameters: {params}")
+                logger.info("Calling tool '%s' with parameters: %s", tool_name, params)
                 result = await client.call_tool(tool_name, params, progress_handler=progress_handler)
             
             console.print(f"[bold green]✓ Tool [cyan]{tool_name}[/cyan] executed successfully!")
-            logger.info(f"Result from tool '{tool_name}': {result}")
+            logger.info("Result from tool '%s': %s", tool_name, result)
             return result
     except Exception as e:
         console.print(f"[bold red]✗ Error calling tool '{tool_name}': {e}")
         logger.error(f"Error calling tool '{tool_name}': {e}")
         return None
+    finally:
+        # Always tear down the progress display, even if the tool failed before reaching 100%
+        if isinstance(progress_handler, _ProgressState):
+            progress_handler.close()
 
 
-async def create_agent(client: MCPClient = None):
+async def create_agent(client: MCPClient):
     """Create agent with OpenAI Agents SDK"""
 
     @function_tool()
@@ -290,19 +372,21 @@ async def create_agent(client: MCPClient = None):
 
         try:
             result = await run_tool(client, "reverse_tool", {"query": "Hello from MCP client!"}, progress_handler=my_progress_handler)
-            logger.info(f"Result from reverse_tool: {result}")
+            logger.info("Result from reverse_tool: %s", result)
             return result.structured_content
         except Exception as e:
             logger.warning(f"Could not call reverse_tool: {e}")
             return "Error calling reverse_tool"
         
     @function_tool()
-    async def random_int_tool(min: int, max: int) -> int:
-        """Generate a random integer between min and max (inclusive)"""
+    async def random_int_tool(min: int, max: int, count: int = 1) -> int | list[int]:
+        """Generate random integers between min and max (inclusive); set count to get several at once"""
         try:
-            result = await run_tool(client, "random_number_tool", {"min": min, "max": max})
-            logger.info(f"Result from random_number_tool: {result}")
-            # Assuming the remote tool returns a dict like {"random_number": value}
+            result = await run_tool(client, "random_number_tool", {"min": min, "max": max, "count": count})
+            logger.info("Result from random_number_tool: %s", result)
+            # The remote tool returns {"random_number": value}, or {"random_numbers": [...]} when count > 1
+            if count > 1:
+                return result.structured_content.get("random_numbers", None)
             return result.structured_content.get("random_number", None)
         except Exception as e:
             logger.warning(f"Could not call random_number_tool: {e}")
@@ -369,56 +453,57 @@ async def run_agent(skip_auth: bool = False):
     # Create the client with the streamable transport
     client = MCPClient(transport=transport)
 
-    # try to connect to the MCP server
-    try:
-        with console.status("[bold blue]Connecting to MCP server...") as status:
-            logger.info("Connecting to the MCP server...")
-            # Use the client as an async context manager
-            async with client:
+    # Keep one session open for the whole run so every tool call reuses it
+    async with AsyncExitStack() as stack:
+        # try to connect to the MCP server; connection errors surface when the session is entered
+        try:
+            with console.status("[bold blue]Connecting to MCP server...") as status:
+                logger.info("Connecting to the MCP server...")
+                await stack.enter_async_context(client)
                 logger.info("Connected to the MCP server successfully")
-        console.print("[bold green]✓ Connected to MCP server")
-    except Exception as e:
-        console.print(f"[bold red]✗ Error connecting to MCP server: {e}")
-        logger.error(f"Error connecting to MCP server: {e}")
-        return
+            console.print("[bold green]✓ Connected to MCP server")
+        except Exception as e:
+            console.print(f"[bold red]✗ Error connecting to MCP server: {e}")
+            logger.error(f"Error connecting to MCP server: {e}")
+            return
 
-    # list tools
-    tools = await list_tools(client)
+        # list tools
+        tools = await list_tools(client)
 
-    # just run the tool reverse_tool to test the connection
-    try:
-        # run with progress handler because reverse_tool is a long-running tool that sends progress updates
-        result = await run_tool(client, "reverse_tool", {"query": "Hello from MCP client!"}, progress_handler=my_progress_handler)
-        logger.info(f"Result from reverse_tool: {result}")
-    except Exception as e:
-        logger.warning(f"Could not call reverse_tool: {e}")
+        # just run the tool reverse_tool to test the connection
+        # run sequentially: both calls show a Rich live display and only one may be active at a time
+        try:
+            # run with progress handler because reverse_tool is a long-running tool that sends progress updates
+            result = await run_tool(client, "reverse_tool", {"query": "Hello from MCP client!"}, progress_handler=my_progress_handler)
+            logger.info("Result from reverse_tool: %s", result)
+        except Exception as e:
+            logger.warning(f"Could not call reverse_tool: {e}")
 
-    # create an agent
-    agent = await create_agent(client)
-    if agent:
-        logger.info(f"Agent created: {agent.name}")
+        # create an agent
+        agent = await create_agent(client)
+        if agent:
+            logger.info(f"Agent created: {agent.name}")
         
-        # Start the agent with nice UI
-        prompt = "Reverse this text: 'Hello, MCP!' and generate a random number between 1 and 40."
-        console.print(Panel(f"[bold blue]Starting agent with prompt: [white]'{prompt}'", 
-                           title="Agent Started", 
-                           border_style="blue"))
+            # Start the agent with nice UI
+            prompt = "Reverse this text: 'Hello, MCP!' and generate a random number between 1 and 40."
+            console.print(Panel(f"[bold blue]Starting agent with prompt: [white]'{prompt}'", 
+                               title="Agent Started", 
+                               border_style="blue"))
         
-        with console.status("[bold purple]Agent is thinking...") as status:
-            result = await Runner.run(agent, prompt)
+            with console.status("[bold purple]Agent is thinking...") as status:
+                result = await Runner.run(agent, prompt)
         
-        # Display the agent's response in a nice panel
-        console.print(Panel(f"[green]{result.final_output}", 
-                           title="Agent Response", 
-                           border_style="green"))
+            # Display the agent's response in a nice panel
+            console.print(Panel(f"[green]{result.final_output}", 
+                               title="Agent Response", 
+                               border_style="green"))
 
 @click.command()
 @click.option('-n', '--no-auth', is_flag=True, help='Skip authentication and connect without JWT token')
 def main(no_auth):
     """Run the MCP client with optional authentication skipping."""
     # Print the location of the .env file for user reference
-    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
-    console.print(f"[blue]Using environment configuration from: [white]{env_path}")
+    console.print(f"[blue]Using environment configuration from: [white]{ENV_PATH}")
     
     asyncio.run(run_agent(skip_auth=no_auth))
 
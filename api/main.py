@@ -2,12 +2,19 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from jose import jwt, JWTError
-import requests
+from fastapi.responses import ORJSONResponse
+import jwt
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import httpx
+import orjson
+import threading
+import time
 from typing import Optional
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,20 +29,118 @@ API_CLIENT_ID = "f9ca7d53-fd9c-4e71-83f1-55f4644a75d6"  # API app registration c
 API_AUDIENCE = f"api://{API_CLIENT_ID}"  # Expected audience format based on authConfig.js
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 JWKS_URL = f"{AUTHORITY}/discovery/v2.0/keys"
+# Azure AD v2.0 tokens use this issuer format
+ISSUER = f"https://sts.windows.net/{TENANT_ID}/"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_jwks():
-    resp = requests.get(JWKS_URL)
-    resp.raise_for_status()
-    return resp.json()
+# Shared HTTP client so JWKS fetches reuse pooled connections and don't block the event loop
+_http = httpx.AsyncClient(http2=True, timeout=5.0)
 
-def verify_jwt(token: str):
+@app.on_event("shutdown")
+async def close_http_client():
+    await _http.aclose()
+
+# Cache the JWKS in-process; Entra ID rotates signing keys rarely
+JWKS_CACHE_TTL = 3600  # seconds
+JWKS_RETRY_BACKOFF = 60  # seconds before retrying after a failed fetch
+JWKS_MIN_REFRESH_INTERVAL = 60  # minimum seconds between fetches forced by an unknown kid
+_JWKS_CACHE = {"data": None, "expires_at": 0, "fetched_at": 0, "error": None}
+_jwks_lock = asyncio.Lock()
+
+def _jwks_cache_is_current(force_refresh: bool) -> bool:
+    if _JWKS_CACHE["data"] is None:
+        return False
+    if force_refresh:
+        # Rate limit forced refreshes so made-up kids can't trigger a fetch per request
+        return time.time() - _JWKS_CACHE["fetched_at"] < JWKS_MIN_REFRESH_INTERVAL
+    return time.time() < _JWKS_CACHE["expires_at"]
+
+def _raise_if_jwks_unavailable():
+    # With no keys cached, fail fast after a failed fetch instead of retrying on every request
+    error = _JWKS_CACHE["error"]
+    if _JWKS_CACHE["data"] is None and error is not None and time.time() - _JWKS_CACHE["fetched_at"] < JWKS_RETRY_BACKOFF:
+        raise RuntimeError(f"JWKS unavailable: {error}") from error
+
+async def get_jwks(force_refresh: bool = False):
+    """Return the JWKS, fetching it only when the cached copy is missing or expired"""
+    if _jwks_cache_is_current(force_refresh):
+        return _JWKS_CACHE["data"]
+    _raise_if_jwks_unavailable()
+
+    async with _jwks_lock:
+        # Another request may have refreshed the cache, or failed to, while we waited for the lock
+        if _jwks_cache_is_current(force_refresh):
+            return _JWKS_CACHE["data"]
+        _raise_if_jwks_unavailable()
+        _JWKS_CACHE["fetched_at"] = time.time()
+        try:
+            resp = await _http.get(JWKS_URL)
+            resp.raise_for_status()
+            _JWKS_CACHE["data"] = resp.json()
+            _JWKS_CACHE["expires_at"] = time.time() + JWKS_CACHE_TTL
+            _JWKS_CACHE["error"] = None
+        except Exception as e:
+            _JWKS_CACHE["error"] = e
+            # Serve the stale keys if we have any, otherwise surface the error
+            if _JWKS_CACHE["data"] is None:
+                raise
+            # Back off so every request doesn't wait out its own timeout during an outage
+            _JWKS_CACHE["expires_at"] = time.time() + JWKS_RETRY_BACKOFF
+        return _JWKS_CACHE["data"]
+
+async def find_jwk(kid: str):
+    """Find the key for kid in the JWKS, refreshing once if it is not cached yet"""
+    for potential_key in (await get_jwks())["keys"]:
+        if potential_key["kid"] == kid:
+            return potential_key
+    # Keys may have been rotated since the last fetch
+    for potential_key in (await get_jwks(force_refresh=True))["keys"]:
+        if potential_key["kid"] == kid:
+            return potential_key
+    return None
+
+# Public key objects built from the JWKS, keyed by kid
+_PUBLIC_KEYS = {}
+
+def get_public_key(kid: str, key: dict):
+    """Return the public key for a JWK, building it only once per kid"""
+    public_key = _PUBLIC_KEYS.get(kid)
+    if public_key is None:
+        public_key = jwt.PyJWK(key).key
+        _PUBLIC_KEYS[kid] = public_key
+    return public_key
+
+# Verified token payloads keyed by a BLAKE2b digest of the token
+TOKEN_CACHE_TTL = 300  # seconds
+_TOKEN_CACHE = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+def _get_cached_payload(token_key: bytes):
+    with _token_cache_lock:
+        payload = _TOKEN_CACHE.get(token_key)
+        if payload is None:
+            return None
+        # The token may expire before the cache entry does
+        if payload.get("exp", 0) <= time.time():
+            _TOKEN_CACHE.pop(token_key, None)
+            return None
+        return payload
+
+def _cache_payload(token_key: bytes, payload: dict):
+    if payload.get("exp", 0) > time.time():
+        with _token_cache_lock:
+            _TOKEN_CACHE[token_key] = payload
+
+async def verify_jwt(token: str):
     """Verify the JWT token is from Entra ID (minimal validation)"""
-    from jose.utils import base64url_decode
-    from cryptography.hazmat.primitives.asymmetric import rsa
-    from cryptography.hazmat.backends import default_backend
-    from cryptography.hazmat.primitives import serialization
+    token_key = _token_key(token)
+    payload = _get_cached_payload(token_key)
+    if payload is not None:
+        return payload
 
     try:
         # Get the token header to find the key ID
@@ -48,13 +153,8 @@ def verify_jwt(token: str):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Get the matching key from Microsoft's JWKS endpoint
-        jwks = get_jwks()
-        key = None
-        for potential_key in jwks["keys"]:
-            if potential_key["kid"] == kid:
-                key = potential_key
-                break
+        # Get the matching key from Microsoft's JWKS endpoint (cached)
+        key = await find_jwk(kid)
         
         if not key:
             raise HTTPException(
@@ -64,26 +164,20 @@ def verify_jwt(token: str):
             )
         
         # Build the public key
-        n_b64 = key["n"].encode("utf-8") if isinstance(key["n"], str) else key["n"]
-        e_b64 = key["e"].encode("utf-8") if isinstance(key["e"], str) else key["e"]
-        n = int.from_bytes(base64url_decode(n_b64), "big")
-        e = int.from_bytes(base64url_decode(e_b64), "big")
-        public_key = rsa.RSAPublicNumbers(e, n).public_key(default_backend())
-        public_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
+        public_key = get_public_key(kid, key)
         
         # Verify signature, audience and issuer
-        payload = jwt.decode(
+        # RSA verification is CPU bound, so run it off the event loop
+        payload = await asyncio.to_thread(
+            jwt.decode,
             token, 
-            public_pem, 
+            public_key, 
             algorithms=["RS256"],
             audience=API_AUDIENCE,  # Use the audience from config: api://CLIENT_ID
-            # Azure AD v2.0 tokens use this issuer format
-            issuer=f"https://sts.windows.net/{TENANT_ID}/"  # Verify token comes from the correct Entra ID tenant
+            issuer=ISSUER  # Verify token comes from the correct Entra ID tenant
         )
         
+        _cache_payload(token_key, payload)
         return payload
     except HTTPException:
         raise
@@ -95,12 +189,11 @@ def verify_jwt(token: str):
         )
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    return verify_jwt(token)
+    return await verify_jwt(token)
 
-@app.post("/reverse")
-async def reverse_string(request: Request, user: dict = Depends(get_current_user)):
+async def handle_reverse(request: Request):
     # Parse the request body
-    body = await request.json()
+    body = orjson.loads(await request.body())
     
     # Extract input_string from the body
     input_string = body.get("input_string", "")
@@ -109,18 +202,18 @@ async def reverse_string(request: Request, user: dict = Depends(get_current_user
         
     return {"reversed": input_string[::-1]}
 
+@app.post("/reverse")
+async def reverse_string(request: Request, user: dict = Depends(get_current_user)):
+    return await handle_reverse(request)
+
 @app.post("/reverse-noauth")
 async def reverse_string_noauth(request: Request):
-    # Parse the request body
-    body = await request.json()
-    
-    # Extract input_string from the body
-    input_string = body.get("input_string", "")
-    if not input_string:
-        raise HTTPException(status_code=400, detail="input_string is required")
-        
-    return {"reversed": input_string[::-1]}
+    return await handle_reverse(request)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8880, reload=True)
+    import os
+    # Run one worker process per WORKERS; auto-reload only works with a single worker
+    # uvicorn's default loop setting already picks uvloop when it is installed
+    workers = int(os.getenv("WORKERS", "1"))
+    uvicorn.run("main:app", host="0.0.0.0", port=8880, reload=workers == 1, workers=workers)
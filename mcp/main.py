@@ -12,11 +12,16 @@ from fastmcp.server.dependencies import get_access_token, AccessToken
 import asyncio
 import random
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging; set LOG_LEVEL=DEBUG in .env to troubleshoot
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
 logger = logging.getLogger(__name__)
 
 # Azure Entra ID configuration
@@ -38,6 +43,13 @@ auth = BearerAuthProvider(
     required_scopes=["execute"]  # Optional: add required scopes if needed
 )
 
+# Upper bound on numbers generated per call
+MAX_RANDOM_COUNT = 10_000
+
+# Number of server processes; sessions live in the memory of the worker that created them,
+# so more than one worker runs the server in stateless HTTP mode
+WORKERS = int(os.getenv("MCP_WORKERS", "1"))
+
 # Create the MCP server with authentication
 mcp = FastMCP("Simple Reverse Server with Azure Auth", auth=auth)
 
@@ -57,14 +69,14 @@ async def reverse_tool(ctx: Context, query: str) -> dict:
     Returns:
         The reversed query string
     """
-    logger.info(f"Reverse tool called with query: {query}")
+    logger.info("Reverse tool called with query: %s", query)
 
     # Pretend to do work
-    # Simulate processing time and report progress
+    # Simulate processing time and report progress once halfway and once at the end
     total_seconds = 5
-    for i in range(total_seconds):
-        await ctx.report_progress(progress=i, total=total_seconds)
-        await asyncio.sleep(1)
+    await asyncio.sleep(total_seconds / 2)
+    await ctx.report_progress(progress=total_seconds / 2, total=total_seconds)
+    await asyncio.sleep(total_seconds / 2)
     await ctx.report_progress(progress=total_seconds, total=total_seconds)
 
     
@@ -74,24 +86,37 @@ async def reverse_tool(ctx: Context, query: str) -> dict:
     return {"reversed_query": reversed_query}
 
 @mcp.tool()
-async def random_number_tool(ctx: Context, min: int, max: int) -> dict:
+async def random_number_tool(ctx: Context, min: int, max: int, count: int = 1) -> dict:
     """
-    Generate a random integer between min and max (inclusive).
+    Generate random integers between min and max (inclusive).
 
     Args:
         ctx: FastMCP context
         min: Minimum value (inclusive)
         max: Maximum value (inclusive)
+        count: How many numbers to generate (at most MAX_RANDOM_COUNT); use this instead of calling the tool repeatedly
 
     Returns:
-        A dictionary with the generated random number
+        A dictionary with the generated random number, or a list of numbers when count > 1
     """
-    logger.info(f"Random number tool called with min: {min}, max: {max}")
+    logger.info("Random number tool called with min: %s, max: %s, count: %s", min, max, count)
     if min > max:
         raise ValueError("min must be less than or equal to max")
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    if count > MAX_RANDOM_COUNT:
+        raise ValueError(f"count must be at most {MAX_RANDOM_COUNT}")
+    if count > 1:
+        numbers = [random.randint(min, max) for _ in range(count)]
+        return {"random_numbers": numbers}
     number = random.randint(min, max)
     return {"random_number": number}
     
+def create_http_app():
+    """App factory used by the uvicorn worker processes"""
+    return mcp.http_app(transport="streamable-http", stateless_http=True)
+
+
 def main():
     """Main entry point for the FastMCP server"""
     logger.info("Starting authenticated FastMCP server...")
@@ -99,7 +124,24 @@ def main():
     logger.info(f"Azure Client ID: {CLIENT_ID}")
     logger.info(f"JWKS URI: {JWKS_URI}")
     
+    # Use the libuv based event loop when available for better network throughput
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     try:
+        if WORKERS > 1:
+            # Spread connections over one event loop per worker process sharing the listening socket
+            import uvicorn
+            logger.info("Starting %s worker processes", WORKERS)
+            uvicorn.run(
+                "main:create_http_app",
+                factory=True,
+                host="0.0.0.0",
+                port=8000,
+                workers=WORKERS,
+            )
+            return
+
         # Run the server with HTTP transport (required for authentication)
         # Authentication only works with HTTP-based transports
         mcp.run(
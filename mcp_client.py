@@ -189,11 +189,9 @@ async def connect_mcp(skip_auth: bool = False):
             tools = await client.list_tools()
             logger.info(f"Found {len(tools)} tools on the server")
             
-            # Print each tool and its details
-            for tool in tools:
-                logger.info(f"Tool: {tool.name}")
-                logger.info(f"  Description: {tool.description}")
-                logger.info("---")
+            # Print each tool and its details as a single record
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("\n".join(f"{tool.name}: {tool.description}" for tool in tools))
             
             # Try calling the reverse_tool
             logger.info("Calling reverse_tool...")